@@ -1,36 +1,78 @@
 #!/usr/bin/env python3
-import argparse, re, subprocess, sys
+import argparse, os, re, subprocess, sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, Iterator, List, Optional, Set
 
 SWIFT_EXT = ".swift"
+# below this many files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+# threads only overlap file reads, so this can exceed the CPU count
+READ_WORKERS = 32
 
-TYPE_DECL_RE = re.compile(r'^\s*(public\s+|internal\s+|fileprivate\s+|private\s+)?(final\s+)?(class|struct|enum|actor|protocol)\s+([A-Za-z_]\w*)', re.M)
-EXT_DECL_RE  = re.compile(r'^\s*extension\s+([A-Za-z_]\w*)', re.M)
-HAS_MAIN_RE  = re.compile(r'^\s*@main\b', re.M)
+# One pass per file for everything declaration-level; dispatch on the group that matched
+DECL_RE      = re.compile(r'^\s*(?:(?:public|internal|fileprivate|private)\s+)?(?:final\s+)?(?:class|struct|enum|actor|protocol)\s+(?P<decl>[A-Za-z_]\w*)'
+                          r'|^\s*extension\s+(?P<ext>[A-Za-z_]\w*)'
+                          r'|^\s*(?P<main>@main)\b', re.M)
+# Swift type names are plain identifiers, so \bName\b matches exactly when a
+# maximal run of word characters equals Name
+WORD_RE      = re.compile(r'\w+')
 
-# Pull .swift paths from xcodebuild output (works when we force a clean build)
+# Pull .swift paths from xcodebuild output (works when we force a clean build).
+# Kept as two patterns run separately: an absolute match can swallow a relative
+# path ("./X.swift", "/a.swift:X.swift") that only the second pattern finds.
 SWIFT_PATH_RE_ABS = re.compile(r'(/[^ \n\t"]+\.swift)\b')
 SWIFT_PATH_RE_REL = re.compile(r'\b([A-Za-z0-9_./-]+\.swift)\b')
 
-@dataclass
+# One record per Swift file, kept for the whole run: explicit __slots__ (no
+# per-instance __dict__) rather than slots=True, which needs Python 3.10.
+@dataclass(frozen=True)
 class SwiftFileInfo:
+    __slots__ = ("rel", "declared_types", "extended_types", "has_main")
     rel: str
     declared_types: List[str]
     extended_types: List[str]
     has_main: bool
 
+# not frozen: instances are pickled back from --jobs workers, and unpickling
+# restores slots with setattr
 @dataclass
+class SwiftFileScan:
+    __slots__ = ("declared_types", "extended_types", "has_main", "words")
+    declared_types: List[str]
+    extended_types: List[str]
+    has_main: bool
+    words: Counter
+
+@dataclass(frozen=True)
 class Result:
+    __slots__ = ("rel", "compiled", "verdict", "symbol_hits", "notes")
     rel: str
     compiled: bool
     verdict: str
     symbol_hits: int
     notes: List[str]
 
-def read_text(p: Path) -> str:
-    return p.read_text(encoding="utf-8", errors="ignore")
+def iter_swift_files(root: Path) -> Iterator[str]:
+    # os.scandir walk: DirEntry carries the file type, so no extra stat() per entry
+    stack = [str(root)]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                if e.is_symlink():
+                    continue
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.name.endswith(SWIFT_EXT) and e.is_file(follow_symlinks=False):
+                    yield e.path
 
 def run_clean_build(project: str, scheme: str, config: str, derived: str, buildlog: str) -> None:
     subprocess.run(["rm", "-rf", derived], check=False)
@@ -46,59 +88,91 @@ def run_clean_build(project: str, scheme: str, config: str, derived: str, buildl
     with open(buildlog, "w", encoding="utf-8", errors="ignore") as f:
         subprocess.run(cmd, stdout=f, stderr=subprocess.STDOUT, text=True)
 
-def extract_compiled_swift_from_buildlog(repo_root: Path, buildlog: str) -> Set[str]:
-    txt = Path(buildlog).read_text(encoding="utf-8", errors="ignore")
+@lru_cache(maxsize=None)
+def rel_of(root: str, path: str) -> Optional[str]:
+    # realpath + prefix slicing instead of Path.resolve().relative_to(); log paths repeat a lot
+    real = os.path.realpath(os.path.join(root, path))
+    prefix = root + os.sep
+    return real[len(prefix):] if real.startswith(prefix) else None
+
+def extract_compiled_swift_from_buildlog(repo_root: Path, buildlog: str, known: Set[str]) -> Set[str]:
     compiled: Set[str] = set()
+    repo_str = str(repo_root)
+    repo_prefix = repo_str + os.sep
 
-    # absolute paths
-    for sp in SWIFT_PATH_RE_ABS.findall(txt):
-        p = Path(sp)
-        if p.exists():
-            try:
-                compiled.add(str(p.resolve().relative_to(repo_root)))
-            except Exception:
-                pass
-
-    # repo-relative paths (often show up as "ColorCoded/Foo.swift")
-    for sp in SWIFT_PATH_RE_REL.findall(txt):
-        cand = (repo_root / sp).resolve()
-        if cand.exists():
-            try:
-                compiled.add(str(cand.relative_to(repo_root)))
-            except Exception:
-                pass
+    # stream the log: it can be hundreds of MB
+    with open(buildlog, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            for sp in SWIFT_PATH_RE_ABS.findall(line) + SWIFT_PATH_RE_REL.findall(line):
+                # files we already scanned resolve by lookup, no filesystem calls
+                if not sp.startswith("/"):
+                    rel = os.path.normpath(sp)
+                elif sp.startswith(repo_prefix):
+                    rel = os.path.normpath(sp[len(repo_prefix):])
+                else:
+                    rel = None
+                if rel is None or rel not in known:
+                    # every real .swift file in the repo was scanned, so after
+                    # resolving symlinks/".." membership stands in for exists()
+                    rel = rel_of(repo_str, sp)
+                if rel in known:
+                    compiled.add(rel)
 
     return compiled
 
-def collect_swift_infos(src_root: Path) -> List[SwiftFileInfo]:
-    repo_root = src_root.parent
+def scan_swift_file(path: str) -> SwiftFileScan:
+    # the only read of each source: declarations and word counts come from one text
+    # (decoded once, so \w keeps str semantics for non-ASCII letters and punctuation)
+    txt = Path(path).read_bytes().decode("utf-8", errors="ignore")
+    declared: Set[str] = set()
+    extended: Set[str] = set()
+    has_main = False
+    for m in DECL_RE.finditer(txt):
+        kind = m.lastgroup
+        if kind == "decl":
+            declared.add(m.group(kind))
+        elif kind == "ext":
+            extended.add(m.group(kind))
+        else:
+            has_main = True
+    return SwiftFileScan(
+        declared_types=sorted(declared),
+        extended_types=sorted(extended),
+        has_main=has_main,
+        words=Counter(WORD_RE.findall(txt))
+    )
+
+def scan_swift_files(root: Path, jobs: int = 1) -> Dict[str, SwiftFileScan]:
+    paths = list(iter_swift_files(root))
+    if jobs > 1 and len(paths) >= PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            scans = list(ex.map(scan_swift_file, paths, chunksize=16))
+    else:
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+            scans = list(ex.map(scan_swift_file, paths))
+    return dict(zip(paths, scans))
+
+def collect_swift_infos(src_root: Path, scans: Dict[str, SwiftFileScan]) -> List[SwiftFileInfo]:
+    base = str(src_root.parent)
+    src_prefix = str(src_root) + os.sep
     infos: List[SwiftFileInfo] = []
-    for p in sorted(src_root.rglob(f"*{SWIFT_EXT}")):
-        txt = read_text(p)
-        declared = sorted(set(m.group(4) for m in TYPE_DECL_RE.finditer(txt)))
-        extended = sorted(set(m.group(1) for m in EXT_DECL_RE.finditer(txt)))
-        has_main = bool(HAS_MAIN_RE.search(txt))
+    # no sorting here: results are ordered once, right before the report
+    for p, scan in scans.items():
+        if not p.startswith(src_prefix):
+            continue
         infos.append(SwiftFileInfo(
-            rel=str(p.resolve().relative_to(repo_root)),
-            declared_types=declared,
-            extended_types=extended,
-            has_main=has_main
+            rel=rel_of(base, p),
+            declared_types=scan.declared_types,
+            extended_types=scan.extended_types,
+            has_main=scan.has_main
         ))
     return infos
 
-def build_corpus(repo_root: Path, exclude_rel: str) -> str:
-    chunks = []
-    for p in repo_root.rglob(f"*{SWIFT_EXT}"):
-        rel = str(p.resolve().relative_to(repo_root))
-        if rel != exclude_rel:
-            chunks.append(read_text(p))
-    return "\n".join(chunks)
-
-def count_hits(corpus: str, symbols: List[str]) -> int:
-    hits = 0
-    for s in symbols:
-        hits += len(re.findall(rf'\b{re.escape(s)}\b', corpus))
-    return hits
+def non_negative_int(value: str) -> int:
+    n = int(value)
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {n}")
+    return n
 
 def main():
     ap = argparse.ArgumentParser()
@@ -108,30 +182,51 @@ def main():
     ap.add_argument("--src", default="ColorCoded")
     ap.add_argument("--derived", default="/tmp/ccdd")
     ap.add_argument("--buildlog", default="/tmp/cc_build.log")
+    ap.add_argument("--jobs", type=non_negative_int, default=1,
+                    help="worker processes for scanning sources (0 = one per CPU)")
     args = ap.parse_args()
 
     repo_root = Path(".").resolve()
     src_root = (repo_root / args.src).resolve()
     if not src_root.exists():
         raise SystemExit(f"Source folder not found: {src_root}")
+    if src_root != repo_root and repo_root not in src_root.parents:
+        raise SystemExit(f"Source folder must be inside the repo: {src_root}")
 
     run_clean_build(args.project, args.scheme, args.config, args.derived, args.buildlog)
-    compiled = extract_compiled_swift_from_buildlog(repo_root, args.buildlog)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    scans = scan_swift_files(repo_root, jobs)
+    file_counts: Dict[str, Counter] = {}
+    for p, scan in scans.items():
+        file_counts[rel_of(str(repo_root), p)] = scan.words
+    compiled = extract_compiled_swift_from_buildlog(repo_root, args.buildlog, set(file_counts))
 
-    infos = collect_swift_infos(src_root)
+    infos = collect_swift_infos(src_root, scans)
 
     print("\n=== Unused Proof Report (clean-build truth) ===")
     print(f"Observed compiled Swift files: {len(compiled)}")
     if len(compiled) == 0:
         print("NOTE: still 0. Next step: paste `grep -n \"CompileSwift\" /tmp/cc_build.log | head -n 40`.\n")
 
+    # only declared/extended names matter; total just those instead of every word
+    wanted = {s for info in infos for s in info.declared_types + info.extended_types}
+    total_counts: Counter = Counter()
+    for c in file_counts.values():
+        for k in c.keys() & wanted:
+            total_counts[k] += c[k]
+
     order = {"HIGH_CONF_UNUSED": 0, "MAYBE_UNUSED": 1, "USED": 2}
     results: List[Result] = []
 
     for info in infos:
-        corpus = build_corpus(repo_root, info.rel)
         symbols = info.declared_types + info.extended_types
-        hits = count_hits(corpus, symbols) if symbols else 0
+        hits = 0
+        # symbols that never appear anywhere have no hits to look up
+        present = [s for s in symbols if s in total_counts]
+        if present:
+            # hits outside this file = hits everywhere - hits in this file
+            self_counts = file_counts.get(info.rel, Counter())
+            hits = sum(total_counts[s] - self_counts[s] for s in present)
         is_compiled = info.rel in compiled
         notes: List[str] = []
 